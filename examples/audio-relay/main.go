@@ -3,117 +3,209 @@ package main
 import (
 	"bufio"
 	"context"
+	"encoding/base64"
+	"encoding/hex"
 	"encoding/json"
 	"fmt"
 	"log"
 	"net/http"
 	"os"
+	"strconv"
+	"strings"
 	"sync"
+	"sync/atomic"
 	"time"
 )
 
-// BufferEntry represents a buffered audio chunk with timing info
-type BufferEntry struct {
-	Data         interface{}
-	ReceivedTime time.Time
-	RelativeTime float64
+// SourceChunk is an audio chunk as received from the source stream
+type SourceChunk struct {
+	IntervalID    string          `json:"interval_id"`
+	LoopCount     int             `json:"loop_count"`
+	Position      int             `json:"position"`
+	TotalChunks   int             `json:"total_chunks"`
+	Timestamp     int64           `json:"timestamp"`
+	Audio         string          `json:"audio"`
+	AudioEncoding string          `json:"audio_encoding,omitempty"`
+	SampleRate    int             `json:"sample_rate"`
+	Channels      int             `json:"channels"`
+	SampleWidth   int             `json:"sample_width"`
+	AudioFormat   json.RawMessage `json:"audio_format,omitempty"`
+	
+	// encoded is the chunk's JSON without its closing brace, rendered once
+	// so relay frames only append their own fields to it
+	encoded []byte
+	
+	// receivedAt is when the chunk was read off the source stream
+	receivedAt time.Time
 }
 
-// AudioBuffer is a ring buffer for audio chunks
+const keepaliveInterval = 15 * time.Second
+
+// keepaliveFrame is an SSE comment line, ignored by EventSource
+var keepaliveFrame = []byte(":\n\n")
+
+// BufferStats summarizes what the audio buffer currently holds
+type BufferStats struct {
+	Size      int     `json:"size"`
+	Duration  float64 `json:"duration"`
+	OldestAge float64 `json:"oldest_age"`
+}
+
+// AudioBuffer is a ring buffer for audio chunks. Chunk data and receive
+// times are kept in parallel preallocated slices so slots are reused
+// rather than reallocated as chunks arrive.
 type AudioBuffer struct {
-	maxSize   int
-	buffer    []BufferEntry
-	startTime *time.Time
-	mu        sync.RWMutex
+	maxSize    int
+	data       []*SourceChunk
+	received   []time.Time
+	writeIndex int // total chunks ever written; next slot is writeIndex % maxSize
+	size       int // chunks currently held
+	oldest     time.Time
+	newest     time.Time
+	mu         sync.RWMutex
 }
 
 // NewAudioBuffer creates a new audio buffer
 func NewAudioBuffer(maxSeconds int) *AudioBuffer {
+	maxSize := maxSeconds * 10 // Assuming 100ms chunks
 	return &AudioBuffer{
-		maxSize: maxSeconds * 10, // Assuming 100ms chunks
-		buffer:  make([]BufferEntry, 0),
+		maxSize:  maxSize,
+		data:     make([]*SourceChunk, maxSize),
+		received: make([]time.Time, maxSize),
 	}
 }
 
-// AddChunk adds a chunk to the buffer
-func (b *AudioBuffer) AddChunk(chunkData interface{}) {
+// AddChunk adds a chunk to the buffer, overwriting the oldest one when full.
+// Receive times come from when the chunk was read off the source stream.
+func (b *AudioBuffer) AddChunk(chunk *SourceChunk) {
 	b.mu.Lock()
 	defer b.mu.Unlock()
 	
-	now := time.Now()
-	if b.startTime == nil {
-		b.startTime = &now
-	}
-	
-	entry := BufferEntry{
-		Data:         chunkData,
-		ReceivedTime: now,
-		RelativeTime: now.Sub(*b.startTime).Seconds(),
-	}
+	slot := b.writeIndex % b.maxSize
+	b.data[slot] = chunk
+	b.received[slot] = chunk.receivedAt
+	b.writeIndex++
 	
-	b.buffer = append(b.buffer, entry)
-	if len(b.buffer) > b.maxSize {
-		b.buffer = b.buffer[1:]
+	if b.size < b.maxSize {
+		b.size++
 	}
+	b.oldest = b.received[(b.writeIndex-b.size)%b.maxSize]
+	b.newest = chunk.receivedAt
 }
 
-// GetChunkAtDelay returns the chunk that should play now given the delay
-func (b *AudioBuffer) GetChunkAtDelay(delaySeconds float64) interface{} {
+// Span returns the sequence numbers of the oldest buffered chunk and of the
+// next chunk to be written. A chunk's sequence number is its position in
+// the stream of all chunks ever added.
+func (b *AudioBuffer) Span() (oldest, next int) {
+	b.mu.RLock()
+	defer b.mu.RUnlock()
+	return b.writeIndex - b.size, b.writeIndex
+}
+
+// ChunkAt returns the chunk with sequence number seq and when it was
+// received, or nil if it has been overwritten or not yet written
+func (b *AudioBuffer) ChunkAt(seq int) (*SourceChunk, time.Time) {
 	b.mu.RLock()
 	defer b.mu.RUnlock()
 	
-	if len(b.buffer) == 0 || b.startTime == nil {
-		return nil
-	}
-	
-	// Special case: zero delay means play the most recent chunk
-	if delaySeconds == 0 {
-		return b.buffer[len(b.buffer)-1].Data
-	}
-	
-	currentRelativeTime := time.Since(*b.startTime).Seconds()
-	targetTime := currentRelativeTime - delaySeconds
-	
-	// Find the chunk closest to our target time
-	for _, entry := range b.buffer {
-		if entry.RelativeTime >= targetTime {
-			return entry.Data
-		}
+	if seq < b.writeIndex-b.size || seq >= b.writeIndex {
+		return nil, time.Time{}
 	}
-	
-	return nil
+	slot := seq % b.maxSize
+	return b.data[slot], b.received[slot]
 }
 
 // GetStats returns buffer statistics
-func (b *AudioBuffer) GetStats() map[string]interface{} {
+func (b *AudioBuffer) GetStats() BufferStats {
 	b.mu.RLock()
 	defer b.mu.RUnlock()
 	
-	if len(b.buffer) == 0 {
-		return map[string]interface{}{"size": 0, "duration": 0}
+	if b.size == 0 {
+		return BufferStats{}
 	}
 	
-	duration := 0.0
-	if len(b.buffer) > 1 {
-		duration = b.buffer[len(b.buffer)-1].RelativeTime - b.buffer[0].RelativeTime
+	return BufferStats{
+		Size:      b.size,
+		Duration:  b.newest.Sub(b.oldest).Seconds(),
+		OldestAge: time.Since(b.oldest).Seconds(),
+	}
+}
+
+// ClientInfo represents a connected client
+type ClientInfo struct {
+	ID       int
+	Queue    chan []byte // delayed frames; a nil entry signals a mode change
+	DelayMs  int
+	realtime atomic.Bool // reads the shared real-time frame instead of Queue
+}
+
+// enqueueDropOldest queues data for a client without blocking. When the
+// queue is full the oldest queued chunk is discarded to make room, so a
+// slow client falls behind on its own instead of stalling the fanout.
+// Returns false if a chunk had to be dropped.
+func enqueueDropOldest(queue chan []byte, data []byte) bool {
+	select {
+	case queue <- data:
+		return true
+	default:
 	}
 	
-	oldestAge := 0.0
-	if len(b.buffer) > 0 {
-		oldestAge = time.Since(b.buffer[0].ReceivedTime).Seconds()
+	select {
+	case <-queue:
+	default:
 	}
 	
-	return map[string]interface{}{
-		"size":       len(b.buffer),
-		"duration":   duration,
-		"oldest_age": oldestAge,
+	select {
+	case queue <- data:
+	default:
 	}
+	return false
 }
 
-// ClientInfo represents a connected client
-type ClientInfo struct {
-	Queue    chan map[string]interface{}
-	DelayMs  int
+// frameBroadcast holds the newest real-time frame. Waiters are handed a
+// channel that is closed when a newer frame is published, so one publish
+// wakes every real-time client at once with no per-client queue. A client
+// that falls behind simply picks up whatever frame is newest when it wakes.
+type frameBroadcast struct {
+	mu    sync.Mutex
+	frame []byte
+	ready chan struct{}
+}
+
+func newFrameBroadcast() *frameBroadcast {
+	return &frameBroadcast{ready: make(chan struct{})}
+}
+
+// publish replaces the latest frame and wakes all waiters
+func (f *frameBroadcast) publish(frame []byte) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	
+	f.frame = frame
+	close(f.ready)
+	f.ready = make(chan struct{})
+}
+
+// wait returns a channel that is closed when the next frame is published
+func (f *frameBroadcast) wait() <-chan struct{} {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	return f.ready
+}
+
+// latest returns the newest frame and the channel to wait on for the one after it
+func (f *frameBroadcast) latest() ([]byte, <-chan struct{}) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	return f.frame, f.ready
+}
+
+// delayGroup holds the clients that share one delay setting. Groups live in
+// a contiguous slice; a group left with no clients stays in place as a
+// tombstone until enough accumulate to be worth compacting.
+type delayGroup struct {
+	delayMs int
+	clients []*ClientInfo
 }
 
 // AudioRelay manages the relay service
@@ -121,12 +213,26 @@ type AudioRelay struct {
 	sourceURL      string
 	buffer         *AudioBuffer
 	listeners      map[int]*ClientInfo
+	groups         []*delayGroup // listeners grouped by DelayMs
+	groupIndex     map[int]int   // DelayMs -> index into groups
+	emptyGroups    int
+	listenerGen    uint64        // bumped whenever group membership changes
+	
+	// Snapshot of the delayed groups used by the fanout. Only touched by
+	// the DelayedPlaybackLoop goroutine and rebuilt when listenerGen moves on.
+	fanoutGroups   []delayGroup
+	fanoutGen      uint64
 	listenersMux   sync.RWMutex
 	currentState   map[string]interface{}
 	isConnected    bool
 	relayID        string
+	relayIDJSON    []byte // relayID encoded as a JSON string
 	clientCounter  int
-	latestChunk    interface{}
+	latestChunk    *SourceChunk
+	realtime       *frameBroadcast // latest frame for 0ms clients
+	keepalive      *frameBroadcast // periodic SSE comment for every client
+	chunks         chan *SourceChunk // decoded chunks awaiting fanout
+	playbackWake   chan struct{}     // nudges DelayedPlaybackLoop when chunks or groups change
 }
 
 // NewAudioRelay creates a new relay instance
@@ -136,12 +242,21 @@ func NewAudioRelay() *AudioRelay {
 		sourceURL = "http://audio-source:8000"
 	}
 	
+	relayID := "relay-buffered"
+	relayIDJSON, _ := json.Marshal(relayID)
+	
 	return &AudioRelay{
 		sourceURL:    sourceURL,
 		buffer:       NewAudioBuffer(20),
 		listeners:    make(map[int]*ClientInfo),
+		groupIndex:   make(map[int]int),
 		currentState: make(map[string]interface{}),
-		relayID:      "relay-buffered",
+		relayID:      relayID,
+		relayIDJSON:  relayIDJSON,
+		chunks:       make(chan *SourceChunk, 10),
+		playbackWake: make(chan struct{}, 1),
+		realtime:     newFrameBroadcast(),
+		keepalive:    newFrameBroadcast(),
 	}
 }
 
@@ -176,27 +291,20 @@ func (r *AudioRelay) ConnectToSource(ctx context.Context) {
 		
 		scanner := bufio.NewScanner(resp.Body)
 		for scanner.Scan() {
-			line := scanner.Text()
-			if len(line) > 6 && line[:6] == "data: " {
-				var data map[string]interface{}
-				if err := json.Unmarshal([]byte(line[6:]), &data); err == nil {
-					// Update current state
-					r.currentState = map[string]interface{}{
-						"source_interval_id": data["interval_id"],
-						"source_loop_count":  data["loop_count"],
-						"source_position":    data["position"],
-						"total_chunks":       data["total_chunks"],
-						"audio_format":       data["audio_format"],
+			line := scanner.Bytes()
+			if len(line) > 6 && string(line[:6]) == "data: " {
+				data := &SourceChunk{receivedAt: time.Now()}
+				if err := json.Unmarshal(line[6:], data); err != nil {
+					continue
+				}
+				// The source opens each stream with a state event that has no
+				// audio or timestamp; only real chunks are buffered and relayed
+				if data.Audio != "" && data.Timestamp != 0 {
+					// Hand off so encoding never holds up reading the source
+					select {
+					case r.chunks <- data:
+					case <-ctx.Done():
 					}
-					
-					// Buffer the chunk
-					r.buffer.AddChunk(data)
-					
-					// Store latest chunk for real-time playback
-					r.latestChunk = data
-					
-					// Send immediately to real-time clients
-					r.sendToRealtimeClients(data)
 				}
 			}
 		}
@@ -208,43 +316,197 @@ func (r *AudioRelay) ConnectToSource(ctx context.Context) {
 	}
 }
 
-// sendToRealtimeClients sends chunk immediately to real-time (0 delay) clients
-func (r *AudioRelay) sendToRealtimeClients(chunkData interface{}) {
-	r.listenersMux.RLock()
-	defer r.listenersMux.RUnlock()
+// ProcessChunks buffers chunks read from the source and fans them out to
+// clients. It runs on its own goroutine so that transcoding and encoding
+// frames for every delay group happens off the source read loop.
+func (r *AudioRelay) ProcessChunks(ctx context.Context) {
+	for {
+		select {
+		case <-ctx.Done():
+			return
+		case data := <-r.chunks:
+			r.relayChunk(data)
+		}
+	}
+}
+
+// relayChunk buffers one source chunk and sends it to clients
+func (r *AudioRelay) relayChunk(data *SourceChunk) {
+	// Update current state
+	r.currentState = map[string]interface{}{
+		"source_interval_id": data.IntervalID,
+		"source_loop_count":  data.LoopCount,
+		"source_position":    data.Position,
+		"total_chunks":       data.TotalChunks,
+		"audio_format":       data.AudioFormat,
+	}
+	
+	// Re-encode the audio once here so every client gets base64
+	transcodeAudio(data)
+	
+	// Encode the chunk once for its whole life in the buffer
+	encoded, err := json.Marshal(data)
+	if err != nil {
+		log.Printf("Failed to encode chunk: %v", err)
+		return
+	}
+	data.encoded = encoded[:len(encoded)-1]
+	
+	// Buffer the chunk
+	r.buffer.AddChunk(data)
+	
+	// Store latest chunk for real-time playback
+	r.latestChunk = data
 	
-	chunk := chunkData.(map[string]interface{})
-	now := time.Now().UnixMilli()
+	// One timestamp and stats snapshot for the whole fanout
+	fields, err := r.newTickFields(time.Now().UnixMilli(), r.buffer.GetStats())
+	if err != nil {
+		log.Printf("Failed to encode buffer stats: %v", err)
+		return
+	}
+	
+	// Send immediately to real-time clients
+	r.sendToRealtimeClients(data, fields)
+	
+	// Delayed clients are served on their own schedule
+	r.wakePlayback()
+}
+
+// wakePlayback tells DelayedPlaybackLoop to recompute its next deadline
+func (r *AudioRelay) wakePlayback() {
+	select {
+	case r.playbackWake <- struct{}{}:
+	default:
+	}
+}
+
+// DelayedPlaybackLoop sends buffered chunks to delayed clients. Each chunk
+// is due for a delay group at its receive time plus the group's delay, and
+// the loop sleeps until the earliest pending deadline. Playback runs off
+// the buffer alone, so delayed clients keep getting audio while the source
+// is down, and chunks received after a reconnect are still delayed by
+// exactly the configured amount.
+func (r *AudioRelay) DelayedPlaybackLoop(ctx context.Context) {
+	cursors := make(map[int]int) // delayMs -> sequence number of the next chunk to send
+	timer := time.NewTimer(time.Hour)
+	defer timer.Stop()
+	
+	for {
+		wait := time.Hour
+		if next, ok := r.sendDueChunks(cursors); ok {
+			wait = time.Until(next)
+		}
+		
+		if !timer.Stop() {
+			select {
+			case <-timer.C:
+			default:
+			}
+		}
+		timer.Reset(wait)
+		
+		select {
+		case <-ctx.Done():
+			return
+		case <-timer.C:
+		case <-r.playbackWake:
+		}
+	}
+}
+
+// sendDueChunks sends each delay group every buffered chunk that has come
+// due, advancing the group's cursor, and returns the earliest deadline
+// still pending. Clients are grouped by delay so each chunk is encoded once
+// per delay however many clients share it.
+func (r *AudioRelay) sendDueChunks(cursors map[int]int) (next time.Time, pending bool) {
+	groups := r.delayedGroups()
+	now := time.Now()
+	oldest, end := r.buffer.Span()
+	var fields *tickFields
 	
-	for clientID, clientInfo := range r.listeners {
-		if clientInfo.DelayMs == 0 {
-			relayData := make(map[string]interface{})
-			for k, v := range chunk {
-				relayData[k] = v
+	for _, group := range groups {
+		delay := time.Duration(group.delayMs) * time.Millisecond
+		
+		cursor, ok := cursors[group.delayMs]
+		if !ok {
+			cursor = r.startCursor(oldest, end, now.Add(-delay))
+		}
+		if cursor < oldest {
+			cursor = oldest
+		}
+		
+		for ; cursor < end; cursor++ {
+			chunk, received := r.buffer.ChunkAt(cursor)
+			if chunk == nil {
+				continue
 			}
-			relayData["relay_id"] = r.relayID
-			relayData["relay_timestamp"] = now
-			relayData["source_timestamp"] = chunk["timestamp"]
-			relayData["configured_delay_ms"] = 0
-			
-			if sourceTs, ok := chunk["timestamp"].(float64); ok {
-				relayData["actual_delay_ms"] = now - int64(sourceTs)
+			due := received.Add(delay)
+			if due.After(now) {
+				if !pending || due.Before(next) {
+					next, pending = due, true
+				}
+				break
 			}
 			
-			relayData["buffer_stats"] = r.buffer.GetStats()
+			// One timestamp and stats snapshot for the whole pass
+			if fields == nil {
+				var err error
+				if fields, err = r.newTickFields(now.UnixMilli(), r.buffer.GetStats()); err != nil {
+					log.Printf("Failed to encode buffer stats: %v", err)
+					return next, pending
+				}
+			}
 			
-			select {
-			case clientInfo.Queue <- relayData:
-			default:
-				log.Printf("Queue full for real-time client %d", clientID)
+			frame := r.buildRelayFrame(chunk, group.delayMs, fields)
+			for _, clientInfo := range group.clients {
+				if !enqueueDropOldest(clientInfo.Queue, frame) {
+					log.Printf("Queue full for client %d, dropped oldest chunk", clientInfo.ID)
+				}
 			}
 		}
+		cursors[group.delayMs] = cursor
 	}
+	
+	// Forget cursors for delays nobody is listening at any more
+	if len(cursors) > len(groups) {
+		for delayMs := range cursors {
+			if !hasDelayGroup(groups, delayMs) {
+				delete(cursors, delayMs)
+			}
+		}
+	}
+	
+	return next, pending
+}
+
+// startCursor picks where a newly seen delay group starts playing: the
+// newest chunk already due at the cutoff, or the oldest buffered chunk if
+// none is due yet
+func (r *AudioRelay) startCursor(oldest, end int, cutoff time.Time) int {
+	for seq := end - 1; seq >= oldest; seq-- {
+		if _, received := r.buffer.ChunkAt(seq); !received.IsZero() && !received.After(cutoff) {
+			return seq
+		}
+	}
+	return oldest
+}
+
+// hasDelayGroup reports whether groups contains one for delayMs
+func hasDelayGroup(groups []delayGroup, delayMs int) bool {
+	for _, group := range groups {
+		if group.delayMs == delayMs {
+			return true
+		}
+	}
+	return false
 }
 
-// PlaybackLoop sends buffered audio to clients based on their delay settings
-func (r *AudioRelay) PlaybackLoop(ctx context.Context) {
-	ticker := time.NewTicker(100 * time.Millisecond)
+// KeepaliveLoop periodically wakes every stream to send an SSE comment, so
+// idle connections (e.g. while the source is down) are not dropped by
+// proxies. One shared ticker serves all clients; streams never arm their
+// own timers.
+func (r *AudioRelay) KeepaliveLoop(ctx context.Context) {
+	ticker := time.NewTicker(keepaliveInterval)
 	defer ticker.Stop()
 	
 	for {
@@ -252,65 +514,200 @@ func (r *AudioRelay) PlaybackLoop(ctx context.Context) {
 		case <-ctx.Done():
 			return
 		case <-ticker.C:
-			r.listenersMux.RLock()
-			clients := make(map[int]*ClientInfo)
-			for id, info := range r.listeners {
-				clients[id] = info
-			}
-			r.listenersMux.RUnlock()
-			
-			for clientID, clientInfo := range clients {
-				if clientInfo.DelayMs > 0 { // Skip real-time clients
-					delaySeconds := float64(clientInfo.DelayMs) / 1000.0
-					chunkData := r.buffer.GetChunkAtDelay(delaySeconds)
-					
-					if chunkData != nil {
-						chunk := chunkData.(map[string]interface{})
-						relayData := make(map[string]interface{})
-						for k, v := range chunk {
-							relayData[k] = v
-						}
-						
-						now := time.Now().UnixMilli()
-						relayData["relay_id"] = r.relayID
-						relayData["relay_timestamp"] = now
-						relayData["source_timestamp"] = chunk["timestamp"]
-						relayData["configured_delay_ms"] = clientInfo.DelayMs
-						
-						if sourceTs, ok := chunk["timestamp"].(float64); ok {
-							relayData["actual_delay_ms"] = now - int64(sourceTs)
-						}
-						
-						relayData["buffer_stats"] = r.buffer.GetStats()
-						
-						select {
-						case clientInfo.Queue <- relayData:
-						default:
-							log.Printf("Queue full for client %d", clientID)
-						}
-					}
-				}
-			}
+			r.keepalive.publish(keepaliveFrame)
+		}
+	}
+}
+
+// transcodeAudio rewrites a chunk's hex audio payload as base64, which is
+// roughly a third smaller on the wire and cheaper for the player to decode.
+// Chunks that are already base64 or not valid hex are left untouched.
+func transcodeAudio(chunk *SourceChunk) {
+	if chunk.AudioEncoding == "base64" {
+		return
+	}
+	
+	raw, err := hex.DecodeString(chunk.Audio)
+	if err != nil {
+		return
+	}
+	chunk.Audio = base64.StdEncoding.EncodeToString(raw)
+	chunk.AudioEncoding = "base64"
+}
+
+// tickFields holds the parts of a relay frame that are identical for every
+// frame sent while fanning out one incoming chunk
+type tickFields struct {
+	now  int64
+	head []byte // relay_id and relay_timestamp, appended after the chunk JSON
+	tail []byte // buffer_stats, closing brace and SSE terminator
+}
+
+// newTickFields renders the per-tick relay fields once for the whole fanout
+func (r *AudioRelay) newTickFields(now int64, stats BufferStats) (*tickFields, error) {
+	statsJSON, err := json.Marshal(stats)
+	if err != nil {
+		return nil, err
+	}
+	
+	head := make([]byte, 0, 64)
+	head = append(head, `,"relay_id":`...)
+	head = append(head, r.relayIDJSON...)
+	head = append(head, `,"relay_timestamp":`...)
+	head = strconv.AppendInt(head, now, 10)
+	
+	tail := make([]byte, 0, len(statsJSON)+20)
+	tail = append(tail, `,"buffer_stats":`...)
+	tail = append(tail, statsJSON...)
+	tail = append(tail, "}\n\n"...)
+	
+	return &tickFields{now: now, head: head, tail: tail}, nil
+}
+
+// buildRelayFrame renders a chunk with the relay fields for one delay
+// setting as a complete SSE "data:" event. The chunk's own JSON and the
+// per-tick fields are reused as-is; only the delay fields are rendered
+// here. Every client sharing that delay is sent the same bytes.
+func (r *AudioRelay) buildRelayFrame(chunk *SourceChunk, delayMs int, fields *tickFields) []byte {
+	frame := make([]byte, 0, len(chunk.encoded)+len(fields.head)+len(fields.tail)+96)
+	frame = append(frame, "data: "...)
+	frame = append(frame, chunk.encoded...)
+	frame = append(frame, fields.head...)
+	frame = append(frame, `,"source_timestamp":`...)
+	frame = strconv.AppendInt(frame, chunk.Timestamp, 10)
+	frame = append(frame, `,"configured_delay_ms":`...)
+	frame = strconv.AppendInt(frame, int64(delayMs), 10)
+	frame = append(frame, `,"actual_delay_ms":`...)
+	frame = strconv.AppendInt(frame, fields.now-chunk.Timestamp, 10)
+	frame = append(frame, fields.tail...)
+	return frame
+}
+
+// sendToRealtimeClients publishes chunk immediately to real-time (0 delay)
+// clients, who all pick it up from the shared latest-frame slot
+func (r *AudioRelay) sendToRealtimeClients(chunk *SourceChunk, fields *tickFields) {
+	r.listenersMux.RLock()
+	idx, ok := r.groupIndex[0]
+	hasClients := ok && len(r.groups[idx].clients) > 0
+	r.listenersMux.RUnlock()
+	
+	if hasClients {
+		r.realtime.publish(r.buildRelayFrame(chunk, 0, fields))
+	}
+}
+
+// delayedGroups returns the delayed client groups for the fanout to walk
+// without holding listenersMux. The snapshot is only rebuilt when a client
+// has connected, disconnected or changed delay since the last call.
+func (r *AudioRelay) delayedGroups() []delayGroup {
+	r.listenersMux.RLock()
+	defer r.listenersMux.RUnlock()
+	
+	if r.fanoutGen == r.listenerGen {
+		return r.fanoutGroups
+	}
+	
+	groups := r.fanoutGroups[:0]
+	for _, group := range r.groups {
+		if group.delayMs == 0 || len(group.clients) == 0 { // Skip real-time clients and tombstones
+			continue
 		}
+		clients := append([]*ClientInfo(nil), group.clients...)
+		groups = append(groups, delayGroup{delayMs: group.delayMs, clients: clients})
+	}
+	r.fanoutGroups = groups
+	r.fanoutGen = r.listenerGen
+	
+	return groups
+}
+
+// addToDelayGroup files a client under its delay. Caller must hold listenersMux.
+func (r *AudioRelay) addToDelayGroup(info *ClientInfo) {
+	idx, ok := r.groupIndex[info.DelayMs]
+	if !ok {
+		r.groups = append(r.groups, &delayGroup{delayMs: info.DelayMs})
+		idx = len(r.groups) - 1
+		r.groupIndex[info.DelayMs] = idx
+	}
+	
+	group := r.groups[idx]
+	if len(group.clients) == 0 && ok {
+		r.emptyGroups--
+	}
+	group.clients = append(group.clients, info)
+	r.listenerGen++
+	if info.DelayMs > 0 {
+		r.wakePlayback()
 	}
 }
 
+// removeFromDelayGroup drops a client from its delay group. Caller must hold listenersMux.
+func (r *AudioRelay) removeFromDelayGroup(info *ClientInfo) {
+	idx, ok := r.groupIndex[info.DelayMs]
+	if !ok {
+		return
+	}
+	
+	group := r.groups[idx]
+	for i, c := range group.clients {
+		if c == info {
+			last := len(group.clients) - 1
+			group.clients[i] = group.clients[last]
+			group.clients[last] = nil
+			group.clients = group.clients[:last]
+			r.listenerGen++
+			break
+		}
+	}
+	
+	if len(group.clients) == 0 {
+		r.emptyGroups++
+		if r.emptyGroups*4 > len(r.groups) {
+			r.compactDelayGroups()
+		}
+	}
+}
+
+// compactDelayGroups removes empty groups and rebuilds the index. Caller
+// must hold listenersMux.
+func (r *AudioRelay) compactDelayGroups() {
+	live := r.groups[:0]
+	for _, group := range r.groups {
+		if len(group.clients) > 0 {
+			live = append(live, group)
+		}
+	}
+	for i := len(live); i < len(r.groups); i++ {
+		r.groups[i] = nil
+	}
+	r.groups = live
+	
+	r.groupIndex = make(map[int]int, len(r.groups))
+	for i, group := range r.groups {
+		r.groupIndex[group.delayMs] = i
+	}
+	r.emptyGroups = 0
+}
+
 // AddClient adds a new client
-func (r *AudioRelay) AddClient(delayMs int) (int, chan map[string]interface{}) {
+func (r *AudioRelay) AddClient(delayMs int) *ClientInfo {
 	r.listenersMux.Lock()
 	defer r.listenersMux.Unlock()
 	
 	clientID := r.clientCounter
 	r.clientCounter++
 	
-	ch := make(chan map[string]interface{}, 10)
-	r.listeners[clientID] = &ClientInfo{
-		Queue:   ch,
+	info := &ClientInfo{
+		ID:      clientID,
+		Queue:   make(chan []byte, 10),
 		DelayMs: delayMs,
 	}
+	info.realtime.Store(delayMs == 0)
+	r.listeners[clientID] = info
+	r.addToDelayGroup(info)
 	
 	log.Printf("Client %d connected with %dms delay. Total: %d", clientID, delayMs, len(r.listeners))
-	return clientID, ch
+	return info
 }
 
 // RemoveClient removes a client
@@ -318,9 +715,11 @@ func (r *AudioRelay) RemoveClient(clientID int) {
 	r.listenersMux.Lock()
 	defer r.listenersMux.Unlock()
 	
+	// The queue is left open: the fanout may still hold this client in its
+	// snapshot for the current chunk, and sending on a closed channel panics
 	if info, ok := r.listeners[clientID]; ok {
-		close(info.Queue)
 		delete(r.listeners, clientID)
+		r.removeFromDelayGroup(info)
 		log.Printf("Client %d disconnected. Total: %d", clientID, len(r.listeners))
 	}
 }
@@ -331,16 +730,23 @@ func (r *AudioRelay) UpdateClientDelay(clientID, delayMs int) {
 	defer r.listenersMux.Unlock()
 	
 	if info, ok := r.listeners[clientID]; ok {
+		r.removeFromDelayGroup(info)
 		info.DelayMs = delayMs
+		r.addToDelayGroup(info)
+		
+		if info.realtime.Swap(delayMs == 0) != (delayMs == 0) {
+			// Wake the stream loop so it switches where it reads frames from
+			enqueueDropOldest(info.Queue, nil)
+		}
 		log.Printf("Updated client %d delay to %dms", clientID, delayMs)
 	}
 }
 
 var relay *AudioRelay
 
-// handleIndex serves the relay web interface
-func handleIndex(w http.ResponseWriter, r *http.Request) {
-	html := fmt.Sprintf(`<!DOCTYPE html>
+// indexHTML is the relay web interface. The only dynamic field is the
+// source connection state, so both variants are rendered once at startup.
+const indexHTML = `<!DOCTYPE html>
 <html>
 <head>
     <title>Audio Relay with Buffer</title>
@@ -350,7 +756,7 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
         h1 { color: #333; }
         .controls { background: #e3f2fd; padding: 20px; border-radius: 5px; margin: 20px 0; }
         .slider-container { margin: 20px 0; }
-        .slider { width: 100%%; height: 40px; -webkit-appearance: none; appearance: none; background: #ddd; outline: none; opacity: 0.7; transition: opacity 0.2s; border-radius: 5px; }
+        .slider { width: 100%; height: 40px; -webkit-appearance: none; appearance: none; background: #ddd; outline: none; opacity: 0.7; transition: opacity 0.2s; border-radius: 5px; }
         .slider:hover { opacity: 1; }
         .slider::-webkit-slider-thumb { -webkit-appearance: none; appearance: none; width: 25px; height: 40px; background: #2196F3; cursor: pointer; border-radius: 5px; }
         .slider::-moz-range-thumb { width: 25px; height: 40px; background: #2196F3; cursor: pointer; border-radius: 5px; }
@@ -393,7 +799,7 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
         
         <div id="status">
             <div class="metric">Status: <span id="state">Disconnected</span></div>
-            <div class="metric">Source Connected: <span id="source-connected">%v</span></div>
+            <div class="metric">Source Connected: <span id="source-connected">__SOURCE_CONNECTED__</span></div>
             <div class="metric">Loop Count: <span id="loop">-</span></div>
             <div class="metric">Position: <span id="position">-</span></div>
             <div class="metric">Actual Latency: <span id="actualLatency">-</span></div>
@@ -474,9 +880,31 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
             }
         }
         
+        // Hex digit char code to value: '0'-'9' map to 0-9, 'a'-'f'/'A'-'F' to 10-15
+        function hexNibble(c) {
+            return (c & 0xf) + (c >> 6) * 9;
+        }
+        
+        function decodeHex(hex) {
+            const bytes = new Uint8Array(hex.length >> 1);
+            for (let i = 0, j = 0; i < bytes.length; i++, j += 2) {
+                bytes[i] = (hexNibble(hex.charCodeAt(j)) << 4) | hexNibble(hex.charCodeAt(j + 1));
+            }
+            return bytes;
+        }
+        
+        function decodeBase64(b64) {
+            const binary = atob(b64);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < bytes.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return bytes;
+        }
+        
         function playChunk(data) {
             try {
-                const bytes = new Uint8Array(data.audio.match(/.{1,2}/g).map(byte => parseInt(byte, 16)));
+                const bytes = data.audio_encoding === 'base64' ? decodeBase64(data.audio) : decodeHex(data.audio);
                 const sampleRate = data.sample_rate || 44100;
                 const channels = data.channels || 1;
                 const sampleWidth = data.sample_width || 2;
@@ -485,12 +913,12 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
                 const buffer = audioContext.createBuffer(channels, samplesPerChannel, sampleRate);
                 
                 if (sampleWidth === 2) {
+                    // WAV PCM is little-endian, matching the browser's typed array byte order
+                    const samples = new Int16Array(bytes.buffer, bytes.byteOffset, samplesPerChannel * channels);
                     for (let channel = 0; channel < channels; channel++) {
                         const channelData = buffer.getChannelData(channel);
                         for (let i = 0; i < samplesPerChannel; i++) {
-                            const byteIndex = (i * channels + channel) * 2;
-                            const int16 = (bytes[byteIndex + 1] << 8) | bytes[byteIndex];
-                            channelData[i] = (int16 > 32767 ? int16 - 65536 : int16) / 32768.0;
+                            channelData[i] = samples[i * channels + channel] / 32768.0;
                         }
                     }
                 }
@@ -527,10 +955,26 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
         }
     </script>
 </body>
-</html>`, relay.isConnected)
+</html>`
+
+var (
+	indexConnected    = renderIndex(true)
+	indexDisconnected = renderIndex(false)
+)
+
+func renderIndex(connected bool) []byte {
+	return []byte(strings.Replace(indexHTML, "__SOURCE_CONNECTED__", strconv.FormatBool(connected), 1))
+}
+
+// handleIndex serves the relay web interface
+func handleIndex(w http.ResponseWriter, r *http.Request) {
+	page := indexDisconnected
+	if relay.isConnected {
+		page = indexConnected
+	}
 	
 	w.Header().Set("Content-Type", "text/html")
-	w.Write([]byte(html))
+	w.Write(page)
 }
 
 // handleStream handles SSE streaming
@@ -551,20 +995,53 @@ func handleStream(w http.ResponseWriter, r *http.Request) {
 	w.Header().Set("Cache-Control", "no-cache")
 	w.Header().Set("Connection", "keep-alive")
 	
-	clientID, ch := relay.AddClient(delayMs)
-	defer relay.RemoveClient(clientID)
+	client := relay.AddClient(delayMs)
+	defer relay.RemoveClient(client.ID)
 	
 	// Send client ID
-	fmt.Fprintf(w, "data: %s\n\n", fmt.Sprintf(`{"client_id":%d}`, clientID))
+	fmt.Fprintf(w, "data: {\"client_id\":%d}\n\n", client.ID)
 	w.(http.Flusher).Flush()
 	
+	// Real-time clients wait on the shared latest frame, delayed ones on their
+	// queue; everyone shares the keepalive ticker
+	var ready <-chan struct{}
+	keepalive := relay.keepalive.wait()
 	for {
+		if !client.realtime.Load() {
+			ready = nil
+		} else if ready == nil {
+			ready = relay.realtime.wait()
+		}
+		
 		select {
-		case chunk := <-ch:
-			if data, err := json.Marshal(chunk); err == nil {
-				fmt.Fprintf(w, "data: %s\n\n", data)
+		case frame := <-client.Queue:
+			if frame == nil {
+				continue
+			}
+			w.Write(frame)
+			
+			// Write out anything else already queued and flush once, so a
+			// client that fell behind catches up in a single flush
+			for pending := len(client.Queue); pending > 0; pending-- {
+				select {
+				case more := <-client.Queue:
+					w.Write(more)
+				default:
+				}
+			}
+			w.(http.Flusher).Flush()
+		case <-ready:
+			var frame []byte
+			frame, ready = relay.realtime.latest()
+			if client.realtime.Load() {
+				w.Write(frame)
 				w.(http.Flusher).Flush()
 			}
+		case <-keepalive:
+			var frame []byte
+			frame, keepalive = relay.keepalive.latest()
+			w.Write(frame)
+			w.(http.Flusher).Flush()
 		case <-r.Context().Done():
 			return
 		}
@@ -625,7 +1102,9 @@ func main() {
 	
 	// Start background tasks
 	go relay.ConnectToSource(ctx)
-	go relay.PlaybackLoop(ctx)
+	go relay.ProcessChunks(ctx)
+	go relay.DelayedPlaybackLoop(ctx)
+	go relay.KeepaliveLoop(ctx)
 	
 	// Setup HTTP routes
 	http.HandleFunc("/", handleIndex)
@@ -1,33 +1,49 @@
 package main
 
 import (
-	"bytes"
+	"context"
 	"encoding/binary"
-	"encoding/hex"
+	"encoding/base64"
 	"encoding/json"
 	"fmt"
 	"io"
 	"log"
+	"net"
 	"net/http"
 	"os"
+	"strconv"
 	"sync"
+	"sync/atomic"
+	"syscall"
 	"time"
 
 	"github.com/google/uuid"
 )
 
-// AudioChunk represents a chunk of audio with metadata
-type AudioChunk struct {
-	IntervalID   string            `json:"interval_id"`
-	LoopCount    int               `json:"loop_count"`
-	Position     int               `json:"position"`
-	TotalChunks  int               `json:"total_chunks"`
-	Timestamp    int64             `json:"timestamp"`
-	Audio        string            `json:"audio"` // hex encoded
-	SampleRate   int               `json:"sample_rate"`
-	Channels     int               `json:"channels"`
-	SampleWidth  int               `json:"sample_width"`
-	AudioFormat  map[string]int    `json:"audio_format"`
+// maxScheduleLag is how far the audio loop may fall behind its schedule
+// before it gives up catching up and resyncs to the current time
+const maxScheduleLag = 500 * time.Millisecond
+
+// streamWriteTimeout bounds each write to a stream client. A client that
+// cannot take a frame in this long is dropped rather than pinning its
+// handler on a full socket.
+const streamWriteTimeout = 5 * time.Second
+
+// maxBatch caps the ?batch= chunk grouping a stream client may request
+const maxBatch = 10
+
+// Slow listener policies, chosen with SLOW_POLICY. They apply when a
+// listener's queue is already full as a new frame arrives.
+const (
+	slowDropOldest = "drop_oldest" // discard the oldest queued frame
+	slowDisconnect = "disconnect"  // close the slow listener's stream
+	slowSkipAhead  = "skip_ahead"  // discard the whole queue and resume live
+)
+
+// Listener is a connected /stream client
+type Listener struct {
+	Queue   chan []byte // encoded frames; a nil frame asks the handler to disconnect
+	evicted bool        // disconnect already queued; only touched by the audio loop
 }
 
 // AudioServer manages the audio loop and clients
@@ -35,26 +51,56 @@ type AudioServer struct {
 	wavFile         string
 	chunkDurationMs int
 	audioChunks     [][]byte
+	audioChunksB64  []string       // base64 of each chunk, encoded once at load
+	audioFormat     map[string]int // static format info shared by every chunk
+	chunkMid        []byte         // total_chunks and timestamp key, rendered at load
+	chunkTail       []byte         // static fields closing every chunk frame, rendered at load
+	loopHead        []byte         // frame prefix through loop_count, rendered at each loop start
 	currentPosition int
 	loopStartTime   time.Time
+	loopStartMs     int64 // loopStartTime in Unix milliseconds, the base for chunk timestamps
 	intervalID      string
 	loopCount       int
 	sampleRate      int
 	channels        int
 	sampleWidth     int
 	
-	listeners    map[chan AudioChunk]bool
+	listeners    map[*Listener]bool
 	listenersMux sync.RWMutex
 	
+	// The fanout's view of the listeners. fanoutMux is only ever held to
+	// swap or read these two fields, so a tick never waits behind listener
+	// bookkeeping or logging under listenersMux.
+	listenerList []*Listener // snapshot of listeners for the fanout, replaced on every change
+	lastFrame    []byte      // newest chunk frame, handed to listeners as they join
+	fanoutMux    sync.Mutex
+	
+	slowPolicy      string
+	droppedFrames   atomic.Int64 // frames discarded under drop_oldest
+	skippedAhead    atomic.Int64 // queues discarded under skip_ahead
+	slowDisconnects atomic.Int64 // listeners closed under disconnect
+	
 	totalDurationMs int
+	sendBufferSize  int // per-connection socket send buffer, about two chunk frames
 }
 
 // NewAudioServer creates a new audio server instance
 func NewAudioServer(wavFile string, chunkDurationMs int) *AudioServer {
+	slowPolicy := os.Getenv("SLOW_POLICY")
+	switch slowPolicy {
+	case slowDropOldest, slowDisconnect, slowSkipAhead:
+	case "":
+		slowPolicy = slowDropOldest
+	default:
+		log.Printf("Unknown SLOW_POLICY %q, using %s", slowPolicy, slowDropOldest)
+		slowPolicy = slowDropOldest
+	}
+	
 	return &AudioServer{
 		wavFile:         wavFile,
 		chunkDurationMs: chunkDurationMs,
-		listeners:       make(map[chan AudioChunk]bool),
+		listeners:       make(map[*Listener]bool),
+		slowPolicy:      slowPolicy,
 	}
 }
 
@@ -66,26 +112,34 @@ func (s *AudioServer) LoadAudio() error {
 	}
 	defer file.Close()
 
-	// Read WAV header
-	var header struct {
-		RiffID      [4]byte
-		Size        uint32
-		WaveID      [4]byte
-		FmtID       [4]byte
-		FmtSize     uint32
-		AudioFormat uint16
-		NumChannels uint16
-		SampleRate  uint32
-		ByteRate    uint32
-		BlockAlign  uint16
-		BitsPerSample uint16
+	// Read RIFF header
+	var riff struct {
+		RiffID [4]byte
+		Size   uint32
+		WaveID [4]byte
 	}
 
-	if err := binary.Read(file, binary.LittleEndian, &header); err != nil {
+	if err := binary.Read(file, binary.LittleEndian, &riff); err != nil {
 		return fmt.Errorf("failed to read WAV header: %w", err)
 	}
+	if string(riff.RiffID[:]) != "RIFF" || string(riff.WaveID[:]) != "WAVE" {
+		return fmt.Errorf("not a RIFF/WAVE file")
+	}
 
-	// Skip to data chunk
+	var format struct {
+		AudioFormat   uint16
+		NumChannels   uint16
+		SampleRate    uint32
+		ByteRate      uint32
+		BlockAlign    uint16
+		BitsPerSample uint16
+	}
+	haveFormat := false
+	
+	// Walk the chunk list to the data chunk. Encoders often put JUNK, LIST
+	// or FLLR chunks ahead of fmt and data, so neither is at a fixed offset.
+	offset := int64(12)
+	var dataSize int64
 	for {
 		var chunkID [4]byte
 		var chunkSize uint32
@@ -96,60 +150,120 @@ func (s *AudioServer) LoadAudio() error {
 		if err := binary.Read(file, binary.LittleEndian, &chunkSize); err != nil {
 			return fmt.Errorf("failed to read chunk size: %w", err)
 		}
+		offset += 8
 		
-		if string(chunkID[:]) == "data" {
-			// Found data chunk
-			s.sampleRate = int(header.SampleRate)
-			s.channels = int(header.NumChannels)
-			s.sampleWidth = int(header.BitsPerSample / 8)
-			
-			// Read all audio data
-			audioData := make([]byte, chunkSize)
-			if _, err := io.ReadFull(file, audioData); err != nil {
-				return fmt.Errorf("failed to read audio data: %w", err)
+		if string(chunkID[:]) == "fmt " {
+			if err := binary.Read(file, binary.LittleEndian, &format); err != nil {
+				return fmt.Errorf("failed to read fmt chunk: %w", err)
 			}
-			
-			// Calculate chunk size
-			bytesPerMs := (s.sampleRate * s.sampleWidth * s.channels) / 1000
-			chunkSize := bytesPerMs * s.chunkDurationMs
-			
-			// Ensure even chunk size for 16-bit audio
-			if chunkSize%2 != 0 {
-				chunkSize++
-			}
-			
-			// Split into chunks
-			s.audioChunks = nil
-			for i := 0; i < len(audioData); i += chunkSize {
-				end := i + chunkSize
-				if end > len(audioData) {
-					end = len(audioData)
-				}
-				
-				chunk := audioData[i:end]
-				if len(chunk) == chunkSize {
-					s.audioChunks = append(s.audioChunks, chunk)
-				} else if len(chunk) > 0 {
-					// Pad last chunk
-					padded := make([]byte, chunkSize)
-					copy(padded, chunk)
-					s.audioChunks = append(s.audioChunks, padded)
-				}
+			haveFormat = true
+		}
+		if string(chunkID[:]) == "data" {
+			if !haveFormat {
+				return fmt.Errorf("data chunk precedes fmt chunk")
 			}
-			
-			s.totalDurationMs = len(s.audioChunks) * s.chunkDurationMs
-			
-			log.Printf("Loaded audio: %d channels, %d Hz, %d-bit, %d chunks, %dms total",
-				s.channels, s.sampleRate, s.sampleWidth*8, len(s.audioChunks), s.totalDurationMs)
-			
-			return nil
+			dataSize = int64(chunkSize)
+			break
 		}
 		
-		// Skip chunk data
-		if _, err := file.Seek(int64(chunkSize), 1); err != nil {
+		// Skip chunk data; chunks are padded to an even length
+		offset += int64(chunkSize) + int64(chunkSize&1)
+		if _, err := file.Seek(offset, io.SeekStart); err != nil {
 			return fmt.Errorf("failed to skip chunk: %w", err)
 		}
 	}
+	
+	s.sampleRate = int(format.SampleRate)
+	s.channels = int(format.NumChannels)
+	s.sampleWidth = int(format.BitsPerSample / 8)
+	
+	// Map the file read-only instead of copying the samples onto the heap.
+	// Chunks are slices of the mapping, so pages are faulted in on demand
+	// and shared with the page cache. The mapping lives for the life of the
+	// process and outlasts the file handle.
+	info, err := file.Stat()
+	if err != nil {
+		return fmt.Errorf("failed to stat WAV file: %w", err)
+	}
+	if offset+dataSize > info.Size() {
+		// Streamed WAVs may leave the data size unset or oversized
+		dataSize = info.Size() - offset
+	}
+	mapped, err := syscall.Mmap(int(file.Fd()), 0, int(info.Size()), syscall.PROT_READ, syscall.MAP_SHARED)
+	if err != nil {
+		return fmt.Errorf("failed to map audio data: %w", err)
+	}
+	audioData := mapped[offset : offset+dataSize]
+	
+	// Calculate chunk size
+	bytesPerMs := (s.sampleRate * s.sampleWidth * s.channels) / 1000
+	chunkSize := bytesPerMs * s.chunkDurationMs
+	
+	// Ensure even chunk size for 16-bit audio
+	if chunkSize%2 != 0 {
+		chunkSize++
+	}
+	
+	// Split into chunks. The count is known up front, so the index is
+	// allocated once and every full chunk is a capped view of the mapping.
+	numChunks := (len(audioData) + chunkSize - 1) / chunkSize
+	s.audioChunks = make([][]byte, numChunks)
+	for i := range s.audioChunks {
+		start := i * chunkSize
+		if end := start + chunkSize; end <= len(audioData) {
+			s.audioChunks[i] = audioData[start:end:end]
+		} else {
+			// Pad last chunk
+			padded := make([]byte, chunkSize)
+			copy(padded, audioData[start:])
+			s.audioChunks[i] = padded
+		}
+	}
+	
+	// Chunks never change after load, so encode them once here
+	// rather than on every tick
+	s.audioChunksB64 = make([]string, len(s.audioChunks))
+	for i, chunk := range s.audioChunks {
+		s.audioChunksB64[i] = base64.StdEncoding.EncodeToString(chunk)
+	}
+	s.audioFormat = map[string]int{
+		"channels":        s.channels,
+		"sample_rate":     s.sampleRate,
+		"bits_per_sample": s.sampleWidth * 8,
+	}
+	formatJSON, err := json.Marshal(s.audioFormat)
+	if err != nil {
+		return fmt.Errorf("failed to encode audio format: %w", err)
+	}
+	
+	tail := make([]byte, 0, len(formatJSON)+128)
+	tail = append(tail, `","audio_encoding":"base64","sample_rate":`...)
+	tail = strconv.AppendInt(tail, int64(s.sampleRate), 10)
+	tail = append(tail, `,"channels":`...)
+	tail = strconv.AppendInt(tail, int64(s.channels), 10)
+	tail = append(tail, `,"sample_width":`...)
+	tail = strconv.AppendInt(tail, int64(s.sampleWidth), 10)
+	tail = append(tail, `,"audio_format":`...)
+	tail = append(tail, formatJSON...)
+	tail = append(tail, "}\n\n"...)
+	s.chunkTail = tail
+	
+	mid := make([]byte, 0, 48)
+	mid = append(mid, `,"total_chunks":`...)
+	mid = strconv.AppendInt(mid, int64(len(s.audioChunks)), 10)
+	mid = append(mid, `,"timestamp":`...)
+	s.chunkMid = mid
+	
+	if len(s.audioChunksB64) > 0 {
+		s.sendBufferSize = 2 * (len(s.audioChunksB64[0]) + len(s.chunkTail) + 160)
+	}
+	
+	s.totalDurationMs = len(s.audioChunks) * s.chunkDurationMs
+	
+	log.Printf("Loaded audio: %d channels, %d Hz, %d-bit, %d chunks, %dms total",
+		s.channels, s.sampleRate, s.sampleWidth*8, len(s.audioChunks), s.totalDurationMs)
+	
+	return nil
 }
 
 // Start begins the audio loop
@@ -161,73 +275,221 @@ func (s *AudioServer) Start() {
 func (s *AudioServer) audioLoop() {
 	time.Sleep(time.Second) // Give server time to start
 	
-	ticker := time.NewTicker(time.Duration(s.chunkDurationMs) * time.Millisecond)
-	defer ticker.Stop()
+	// Schedule against absolute deadlines so sleep jitter never accumulates.
+	// After a short stall the loop sends back-to-back to catch up; after a
+	// long one it resyncs rather than flooding listeners with a burst.
+	interval := time.Duration(s.chunkDurationMs) * time.Millisecond
+	next := time.Now().Add(interval)
 	
-	for range ticker.C {
+	for {
+		if wait := time.Until(next); wait > 0 {
+			time.Sleep(wait)
+		} else if -wait > maxScheduleLag {
+			log.Printf("Audio loop fell %v behind, resyncing", -wait)
+			next = time.Now()
+			// Rebase the loop start so timestamps keep tracking the clock
+			s.loopStartTime = next.Add(-time.Duration(s.currentPosition) * interval)
+			s.loopStartMs = s.loopStartTime.UnixMilli()
+		}
+		// The deadline we just woke for doubles as this tick's clock reading
+		tick := next
+		next = next.Add(interval)
+		
 		// Start of new loop
 		if s.currentPosition == 0 {
 			s.intervalID = uuid.New().String()
-			s.loopStartTime = time.Now()
+			s.loopStartTime = tick
+			s.loopStartMs = tick.UnixMilli()
 			s.loopCount++
-			log.Printf("Starting loop #%d, interval: %s", s.loopCount, s.intervalID)
+			// Short files wrap every few seconds; log the first loop and
+			// then every 100th so the log isn't one line per pass
+			if s.loopCount == 1 || s.loopCount%100 == 0 {
+				log.Printf("Starting loop #%d, interval: %s", s.loopCount, s.intervalID)
+			}
+			
+			// interval_id and loop_count hold for the whole loop
+			head := make([]byte, 0, len(s.intervalID)+64)
+			head = append(head, `data: {"interval_id":"`...)
+			head = append(head, s.intervalID...)
+			head = append(head, `","loop_count":`...)
+			head = strconv.AppendInt(head, int64(s.loopCount), 10)
+			head = append(head, `,"position":`...)
+			s.loopHead = head
 		}
 		
-		// Create chunk data
-		chunk := AudioChunk{
-			IntervalID:  s.intervalID,
-			LoopCount:   s.loopCount,
-			Position:    s.currentPosition,
-			TotalChunks: len(s.audioChunks),
-			Timestamp:   time.Now().UnixMilli(),
-			Audio:       hex.EncodeToString(s.audioChunks[s.currentPosition]),
-			SampleRate:  s.sampleRate,
-			Channels:    s.channels,
-			SampleWidth: s.sampleWidth,
-			AudioFormat: map[string]int{
-				"channels":        s.channels,
-				"sample_rate":     s.sampleRate,
-				"bits_per_sample": s.sampleWidth * 8,
-			},
-		}
+		// Timestamps advance by exactly one chunk duration per position
+		timestamp := s.loopStartMs + int64(s.currentPosition*s.chunkDurationMs)
 		
-		// Send to all listeners
-		s.broadcast(chunk)
+		// Render once and share the same frame with all listeners
+		s.broadcast(s.buildChunkFrame(timestamp))
 		
-		// Move to next position
-		s.currentPosition = (s.currentPosition + 1) % len(s.audioChunks)
+		// Move to next position, wrapping at the end of the file
+		s.currentPosition++
+		if s.currentPosition == len(s.audioChunks) {
+			s.currentPosition = 0
+		}
+	}
+}
+
+// tuneConn sets up each accepted connection for real-time streaming. Nagle
+// is disabled so every frame goes out as soon as it is written, and the
+// kernel send buffer is capped at a couple of chunks so a congested client
+// backs up into its listener queue, where old frames are dropped, rather
+// than into seconds of audio queued in the socket.
+func (s *AudioServer) tuneConn(ctx context.Context, c net.Conn) context.Context {
+	if tc, ok := c.(*net.TCPConn); ok {
+		tc.SetNoDelay(true)
+		if s.sendBufferSize > 0 {
+			tc.SetWriteBuffer(s.sendBufferSize)
+		}
 	}
+	return ctx
 }
 
-// broadcast sends chunk to all listeners
-func (s *AudioServer) broadcast(chunk AudioChunk) {
-	s.listenersMux.RLock()
-	defer s.listenersMux.RUnlock()
+// buildChunkFrame renders the chunk at the current position as a complete
+// SSE "data:" event. The schema is fixed, so fields are appended straight
+// into the frame rather than going through json.Marshal; interval IDs are
+// UUIDs and the audio is base64, so neither needs escaping. Everything but
+// the position, timestamp and audio is pre-rendered per loop or at load.
+func (s *AudioServer) buildChunkFrame(timestamp int64) []byte {
+	audio := s.audioChunksB64[s.currentPosition]
 	
-	for ch := range s.listeners {
+	frame := make([]byte, 0, len(s.loopHead)+len(s.chunkMid)+len(audio)+len(s.chunkTail)+48)
+	frame = append(frame, s.loopHead...)
+	frame = strconv.AppendInt(frame, int64(s.currentPosition), 10)
+	frame = append(frame, s.chunkMid...)
+	frame = strconv.AppendInt(frame, timestamp, 10)
+	frame = append(frame, `,"audio":"`...)
+	frame = append(frame, audio...)
+	frame = append(frame, s.chunkTail...)
+	return frame
+}
+
+// broadcast sends an encoded frame to all listeners. The snapshot is only
+// rebuilt when someone connects or disconnects, so a tick just walks a
+// slice, and it does so outside the lock. Every send is non-blocking, so
+// no listener can hold up the others.
+func (s *AudioServer) broadcast(data []byte) {
+	s.fanoutMux.Lock()
+	listeners := s.listenerList
+	// Swapped together with the snapshot read, so a joining listener gets
+	// each frame exactly once: either as its first frame or in its queue
+	s.lastFrame = data
+	s.fanoutMux.Unlock()
+	
+	for _, l := range listeners {
+		if l.evicted {
+			continue
+		}
 		select {
-		case ch <- chunk:
+		case l.Queue <- data:
 		default:
-			// Channel full, skip
+			s.handleSlowListener(l, data)
 		}
 	}
 }
 
-// AddListener adds a new listener channel
-func (s *AudioServer) AddListener(ch chan AudioChunk) {
+// handleSlowListener applies the slow listener policy to a listener whose
+// queue is full
+func (s *AudioServer) handleSlowListener(l *Listener, data []byte) {
+	switch s.slowPolicy {
+	case slowDisconnect:
+		// Clear the queue so the handler sees the sentinel next, then stop
+		// sending to it until it unregisters
+		drainQueue(l.Queue)
+		enqueueDropOldest(l.Queue, nil)
+		l.evicted = true
+		s.slowDisconnects.Add(1)
+	case slowSkipAhead:
+		drainQueue(l.Queue)
+		enqueueDropOldest(l.Queue, data)
+		s.skippedAhead.Add(1)
+	default:
+		enqueueDropOldest(l.Queue, data)
+		s.droppedFrames.Add(1)
+	}
+}
+
+// publishListeners builds a fresh listener snapshot and hands it to the
+// fanout, returning the newest frame sent before the swap. Snapshots are
+// never modified once published. Must be called with listenersMux held.
+func (s *AudioServer) publishListeners() []byte {
+	list := make([]*Listener, 0, len(s.listeners))
+	for l := range s.listeners {
+		list = append(list, l)
+	}
+	
+	s.fanoutMux.Lock()
+	defer s.fanoutMux.Unlock()
+	s.listenerList = list
+	return s.lastFrame
+}
+
+// sseFrame wraps an encoded payload as a complete SSE event, sized in one
+// allocation so handlers can write it straight to the connection
+func sseFrame(data []byte) []byte {
+	frame := make([]byte, 0, len(data)+8)
+	frame = append(frame, "data: "...)
+	frame = append(frame, data...)
+	frame = append(frame, "\n\n"...)
+	return frame
+}
+
+// drainQueue discards everything currently queued
+func drainQueue(ch chan []byte) {
+	for {
+		select {
+		case <-ch:
+		default:
+			return
+		}
+	}
+}
+
+// enqueueDropOldest queues a frame for a listener without blocking. When
+// the queue is full the oldest frame is discarded to make room, so a slow
+// listener skips ahead instead of stalling the audio loop.
+func enqueueDropOldest(ch chan []byte, data []byte) {
+	select {
+	case ch <- data:
+		return
+	default:
+	}
+	
+	select {
+	case <-ch:
+	default:
+	}
+	
+	select {
+	case ch <- data:
+	default:
+	}
+}
+
+// AddListener adds a new listener and returns the newest frame broadcast
+// before it joined, or nil before the first tick
+func (s *AudioServer) AddListener(l *Listener) []byte {
 	s.listenersMux.Lock()
-	defer s.listenersMux.Unlock()
-	s.listeners[ch] = true
-	log.Printf("Client connected. Total listeners: %d", len(s.listeners))
+	s.listeners[l] = true
+	lastFrame := s.publishListeners()
+	count := len(s.listeners)
+	s.listenersMux.Unlock()
+	
+	log.Printf("Client connected. Total listeners: %d", count)
+	return lastFrame
 }
 
-// RemoveListener removes a listener channel
-func (s *AudioServer) RemoveListener(ch chan AudioChunk) {
+// RemoveListener removes a listener. Its queue is left open: a fanout
+// still walking an older snapshot may send to it one last time.
+func (s *AudioServer) RemoveListener(l *Listener) {
 	s.listenersMux.Lock()
-	defer s.listenersMux.Unlock()
-	delete(s.listeners, ch)
-	close(ch)
-	log.Printf("Client disconnected. Total listeners: %d", len(s.listeners))
+	delete(s.listeners, l)
+	s.publishListeners()
+	count := len(s.listeners)
+	s.listenersMux.Unlock()
+	
+	log.Printf("Client disconnected. Total listeners: %d", count)
 }
 
 // GetState returns current server state
@@ -245,11 +507,7 @@ func (s *AudioServer) GetState() map[string]interface{} {
 		"elapsed_ms":       elapsedMs,
 		"total_duration_ms": s.totalDurationMs,
 		"chunk_duration_ms": s.chunkDurationMs,
-		"audio_format": map[string]int{
-			"channels":        s.channels,
-			"sample_rate":     s.sampleRate,
-			"bits_per_sample": s.sampleWidth * 8,
-		},
+		"audio_format":      s.audioFormat,
 	}
 }
 
@@ -343,9 +601,18 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
             }
         }
         
+        function decodeBase64(b64) {
+            const binary = atob(b64);
+            const bytes = new Uint8Array(binary.length);
+            for (let i = 0; i < bytes.length; i++) {
+                bytes[i] = binary.charCodeAt(i);
+            }
+            return bytes;
+        }
+        
         function playChunk(data) {
             try {
-                const bytes = new Uint8Array(data.audio.match(/.{1,2}/g).map(byte => parseInt(byte, 16)));
+                const bytes = decodeBase64(data.audio);
                 const sampleRate = data.sample_rate || 44100;
                 const channels = data.channels || 1;
                 const sampleWidth = data.sample_width || 2;
@@ -354,12 +621,12 @@ func handleIndex(w http.ResponseWriter, r *http.Request) {
                 const buffer = audioContext.createBuffer(channels, samplesPerChannel, sampleRate);
                 
                 if (sampleWidth === 2) {
+                    // WAV PCM is little-endian, matching the browser's typed array byte order
+                    const samples = new Int16Array(bytes.buffer, bytes.byteOffset, samplesPerChannel * channels);
                     for (let channel = 0; channel < channels; channel++) {
                         const channelData = buffer.getChannelData(channel);
                         for (let i = 0; i < samplesPerChannel; i++) {
-                            const byteIndex = (i * channels + channel) * 2;
-                            const int16 = (bytes[byteIndex + 1] << 8) | bytes[byteIndex];
-                            channelData[i] = (int16 > 32767 ? int16 - 65536 : int16) / 32768.0;
+                            channelData[i] = samples[i * channels + channel] / 32768.0;
                         }
                     }
                 }
@@ -409,24 +676,58 @@ func handleStream(w http.ResponseWriter, r *http.Request) {
 	w.Header().Set("Connection", "keep-alive")
 	w.Header().Set("Access-Control-Allow-Origin", "*")
 	
-	ch := make(chan AudioChunk, 10)
-	audioServer.AddListener(ch)
-	defer audioServer.RemoveListener(ch)
+	// ?batch=N delivers chunks N at a time in a single write, trading up to
+	// N-1 chunk durations of latency for fewer writes and TCP segments
+	batch := 1
+	if n, err := strconv.Atoi(r.URL.Query().Get("batch")); err == nil && n > 1 {
+		batch = min(n, maxBatch)
+	}
+	
+	listener := &Listener{Queue: make(chan []byte, 4+batch)}
+	lastFrame := audioServer.AddListener(listener)
+	defer audioServer.RemoveListener(listener)
+	
+	rc := http.NewResponseController(w)
+	send := func(frame []byte) error {
+		rc.SetWriteDeadline(time.Now().Add(streamWriteTimeout))
+		if _, err := w.Write(frame); err != nil {
+			return err
+		}
+		return rc.Flush()
+	}
 	
-	// Send initial state
+	// Send initial state together with the current chunk in one write, so
+	// the new listener starts playing now rather than at the next tick
+	var initial []byte
 	state := audioServer.GetState()
 	if data, err := json.Marshal(state); err == nil {
-		fmt.Fprintf(w, "data: %s\n\n", data)
-		w.(http.Flusher).Flush()
+		initial = sseFrame(data)
+	}
+	initial = append(initial, lastFrame...)
+	if err := send(initial); err != nil {
+		return
 	}
 	
 	// Stream chunks
+	var pending []byte
+	queued := 0
 	for {
 		select {
-		case chunk := <-ch:
-			if data, err := json.Marshal(chunk); err == nil {
-				fmt.Fprintf(w, "data: %s\n\n", data)
-				w.(http.Flusher).Flush()
+		case frame := <-listener.Queue:
+			if frame == nil {
+				log.Printf("Disconnecting slow listener")
+				return
+			}
+			if batch > 1 {
+				pending = append(pending, frame...)
+				if queued++; queued < batch {
+					continue
+				}
+				frame, pending, queued = pending, pending[:0], 0
+			}
+			if err := send(frame); err != nil {
+				log.Printf("Stream write failed: %v", err)
+				return
 			}
 		case <-r.Context().Done():
 			return
@@ -440,6 +741,12 @@ func handleStatus(w http.ResponseWriter, r *http.Request) {
 	audioServer.listenersMux.RLock()
 	state["listeners"] = len(audioServer.listeners)
 	audioServer.listenersMux.RUnlock()
+	state["slow_listeners"] = map[string]interface{}{
+		"policy":         audioServer.slowPolicy,
+		"dropped_frames": audioServer.droppedFrames.Load(),
+		"skipped_ahead":  audioServer.skippedAhead.Load(),
+		"disconnected":   audioServer.slowDisconnects.Load(),
+	}
 	
 	w.Header().Set("Content-Type", "application/json")
 	json.NewEncoder(w).Encode(state)
@@ -464,7 +771,11 @@ func main() {
 	
 	// Start HTTP server
 	log.Println("Audio source server started on :8000")
-	if err := http.ListenAndServe(":8000", nil); err != nil {
+	server := &http.Server{
+		Addr:        ":8000",
+		ConnContext: audioServer.tuneConn,
+	}
+	if err := server.ListenAndServe(); err != nil {
 		log.Fatalf("Failed to start server: %v", err)
 	}
 }
\ No newline at end of file